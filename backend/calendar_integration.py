@@ -10,6 +10,10 @@ Importar desde aquí en lugar de calendar_service directamente
 para mantener compatibilidad con el plan de rutas de main.py.
 """
 
+import threading
+import time
+from typing import Optional, Tuple
+
 from backend.services.calendar_service import (
     CalendarService,
     get_calendar_service,
@@ -25,6 +29,13 @@ __all__ = [
     "get_calendar_status",
 ]
 
+# El estado de las credenciales cambia muy rara vez y el frontend lo
+# consulta cada pocos segundos: se reutiliza el resultado durante 30 s.
+STATUS_TTL_SECONDS = 30.0
+
+_status_lock = threading.Lock()
+_status_cache: Optional[Tuple[float, dict]] = None  # (expira_en, estado)
+
 
 def get_calendar_status() -> dict:
     """
@@ -37,22 +48,37 @@ def get_calendar_status() -> dict:
             "message": str
         }
     """
-    try:
-        service = get_calendar_service()
-        # CalendarService expone `simulation_mode` cuando no hay credenciales
-        is_simulation = getattr(service, 'simulation_mode', True)
-        return {
-            "google_calendar_active": not is_simulation,
-            "mode": "simulation" if is_simulation else "real",
-            "message": (
-                "Modo simulación activo. Configure credentials.json para activar Google Calendar."
-                if is_simulation
-                else "Google Calendar conectado y activo."
-            )
-        }
-    except Exception as e:
-        return {
-            "google_calendar_active": False,
-            "mode": "simulation",
-            "message": f"Error al verificar estado: {str(e)}"
-        }
+    global _status_cache
+
+    with _status_lock:
+        if _status_cache is not None and _status_cache[0] > time.monotonic():
+            return dict(_status_cache[1])
+
+        try:
+            status = _consultar_estado()
+        except Exception as e:
+            # Los errores no se cachean para reintentar en el siguiente sondeo
+            return {
+                "google_calendar_active": False,
+                "mode": "simulation",
+                "message": f"Error al verificar estado: {str(e)}"
+            }
+
+        _status_cache = (time.monotonic() + STATUS_TTL_SECONDS, status)
+        return dict(status)
+
+
+def _consultar_estado() -> dict:
+    """Consulta el servicio de calendario (sin caché)"""
+    service = get_calendar_service()
+    # CalendarService expone `simulation_mode` cuando no hay credenciales
+    is_simulation = getattr(service, 'simulation_mode', True)
+    return {
+        "google_calendar_active": not is_simulation,
+        "mode": "simulation" if is_simulation else "real",
+        "message": (
+            "Modo simulación activo. Configure credentials.json para activar Google Calendar."
+            if is_simulation
+            else "Google Calendar conectado y activo."
+        )
+    }
@@ -18,6 +18,8 @@ from enum import Enum
 import operator
 from datetime import datetime
 
+import orjson
+
 # Note: In production, use actual langgraph:
 # from langgraph.graph import StateGraph, END
 # For now, we implement a compatible interface
@@ -102,6 +104,15 @@ class ProcedureState:
             elif hasattr(state, key):
                 setattr(state, key, value)
         return state
+    
+    def to_json(self) -> bytes:
+        """Serialize every field to JSON bytes (enums encode as their value)"""
+        return orjson.dumps(self)
+    
+    @classmethod
+    def from_json(cls, raw: bytes) -> "ProcedureState":
+        """Create state from bytes produced by to_json()"""
+        return cls.from_dict(orjson.loads(raw))
 
 
 class ProcedureWorkflow:
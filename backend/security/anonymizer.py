@@ -219,6 +219,21 @@ class PIIAnonymizer:
         
         return result
     
+    def anonymize_batch(
+        self,
+        items: List[Tuple[str, Optional[str]]]
+    ) -> List[AnonymizationResult]:
+        """
+        Anonymize several texts in one call.
+        
+        Args:
+            items: (text, session_id) pairs
+            
+        Returns:
+            One AnonymizationResult per item, in the same order
+        """
+        return [self.anonymize(text, session_id) for text, session_id in items]
+    
     def deanonymize(self, text: str, mapping: Dict[str, str]) -> str:
         """
         Restore original PII values from anonymized text.